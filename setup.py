@@ -23,5 +23,6 @@ setup(
     author_email='daftonshady@gmail.com',
     license=open('LICENSE').read(),
     description='Web framework based on async networking server',
-    install_requires=requires
+    install_requires=requires,
+    python_requires='>=3.6'
 )
@@ -2,8 +2,36 @@
 
 """Tests for wind"""
 
+import socket
 import unittest
+from unittest import mock
+from wind import __version__
+from wind.driver import PollEvents
+from wind.reactor import PollReactor
+from wind.web import app as wind_app
 from wind.datastructures import FlexibleDeque, CaseInsensitiveDict
+from wind.exceptions import ApplicationError
+from wind.web.app import WindApp, PathDispatcher, Resource, path
+from wind.web.httpmodels import (
+    HTTPRequest, HTTPRequestHeader, HTTPResponseHeader, HTTPMethodId)
+
+
+class FakeStream(object):
+    """Stream keeping written chunks instead of writing to socket"""
+    def __init__(self):
+        self.written = []
+
+    def write(self, chunk, callback):
+        self.written.append(chunk)
+        callback()
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.stream = FakeStream()
+
+    def close(self):
+        pass
 
 
 class StreamTestCase(unittest.TestCase):
@@ -61,5 +89,276 @@ class DatastructuresTestCase(unittest.TestCase):
         assert v == 'octagon'
 
 
+class HTTPModelsTestCase(unittest.TestCase):
+    """Tests for modules in wind.web.httpmodels"""
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_request_version_info(self):
+        assert HTTPRequest(version='HTTP/1.0').version_info == (1, 0)
+        assert HTTPRequest(version='HTTP/1.1').version_info == (1, 1)
+        assert HTTPRequest(version='HTTP/wind').version_info is None
+
+    def test_response_header_serialize(self):
+        header = HTTPResponseHeader()
+        header.add_content_length(4)
+        header.to_json_content()
+        assert header.serialize() == (
+            b'Content-Type: application/json; charset=UTF-8\r\n'
+            b'Server: wind ' + __version__.encode() + b'\r\n'
+            b'Content-Length: 4\r\n')
+
+        header.clear()
+        assert b'Content-Length' not in header.serialize()
+
+        # `to_dict` returns copy, so mutating it doesn't affect header.
+        header.to_dict()['Etag'] = 'wind'
+        assert header.get('Etag') is None
+        assert b'Etag' not in header.serialize()
+
+
+class AppTestCase(unittest.TestCase):
+    """Tests for modules in wind.web.app"""
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_path_dispatcher_lookup(self):
+        def handler(request):
+            return 'wind'
+
+        index = path(handler, route='/', methods=['get'])
+        user = path(handler, route='/users/:id', methods=['get'])
+        profile = path(handler, route='/users/me', methods=['get'])
+        static = path(handler, route='/static/*filename', methods=['get'])
+        dispatcher = PathDispatcher([index, user, profile, static])
+
+        # Static routes.
+        assert dispatcher.lookup('/') is index
+        assert dispatcher.lookup('/users/me') is profile
+
+        # Dynamic routes.
+        assert dispatcher.lookup('/users/daftshady') is user
+        assert dispatcher.lookup('/static/css/wind.css') is static
+
+        # Not registered.
+        assert dispatcher.lookup('/users') is None
+        assert dispatcher.lookup('/users/daftshady/posts') is None
+
+    def test_path_dispatcher_invalid_urls(self):
+        self.assertRaises(ApplicationError, PathDispatcher, '/')
+        self.assertRaises(ApplicationError, PathDispatcher, None)
+
+    def test_resource_dispatch_table(self):
+        class WindResource(Resource):
+            def handle_get(self):
+                pass
+
+        table = WindResource._dispatch_table
+        assert table[HTTPMethodId.GET] is WindResource.handle_get
+        assert table[HTTPMethodId.POST] is Resource.handle_post
+        assert Resource._dispatch_table[HTTPMethodId.GET] is \
+            Resource.handle_get
+
+    def test_resource_write_json(self):
+        resource = Resource()
+        resource.write_json({'wind': [1, 2]})
+        assert bytes(resource._body) == b'{"wind":[1,2]}'
+        assert resource._response_header.content_type == \
+            'application/json; charset=UTF-8'
+
+        # `dict` passed to `write` falls back to `write_json`.
+        resource = Resource()
+        resource.write({'wind': 1})
+        assert bytes(resource._body) == b'{"wind":1}'
+        assert resource._response_header.content_type == \
+            'application/json; charset=UTF-8'
+
+        self.assertRaises(ApplicationError, Resource().write, ['wind'])
+
+    def test_resource_unsupported_method(self):
+        class WindResource(Resource):
+            def handle_get(self):
+                self.write('wind')
+                self.finish()
+
+        app = WindApp([path(WindResource, route='/', methods=['get'])])
+        conn = FakeConnection()
+        request = HTTPRequest(
+            url='/', method='PATCH', version='HTTP/1.1',
+            headers=HTTPRequestHeader())
+        assert request.method_id is None
+
+        app.react(conn, request)
+        assert conn.stream.written[0].startswith(
+            b'HTTP/1.1 405 Method Not Allowed\r\n')
+
+    def test_resource_etag(self):
+        class WindResource(Resource):
+            def handle_get(self):
+                self.write('wind')
+                self.finish()
+
+        class NoEtagResource(WindResource):
+            def _etag_available(self):
+                return False
+
+        def response(resource_class, version):
+            app = WindApp([path(resource_class, route='/', methods=['get'])])
+            conn = FakeConnection()
+            app.react(conn, HTTPRequest(
+                url='/', method='GET', version=version,
+                headers=HTTPRequestHeader()))
+            return conn.stream.written[0]
+
+        assert b'Etag: ' in response(WindResource, 'HTTP/1.1')
+        assert b'Etag: ' not in response(WindResource, 'HTTP/1.0')
+        assert b'Etag: ' not in response(NoEtagResource, 'HTTP/1.1')
+
+        # Error path doesn't create hasher.
+        with mock.patch('hashlib.blake2b') as blake2b:
+            app = WindApp([])
+            app.react(FakeConnection(), HTTPRequest(
+                url='/wind', method='GET', version='HTTP/1.1',
+                headers=HTTPRequestHeader()))
+            assert not blake2b.called
+
+    def test_resource_etag_with_initialize(self):
+        users = iter(range(2))
+
+        class WindResource(Resource):
+            def initialize(self):
+                self.write('user-%d;' % next(users))
+
+            def handle_get(self):
+                self.write('same')
+                self.finish()
+
+        app = WindApp([path(WindResource, route='/', methods=['get'])])
+
+        def serve(etag=''):
+            conn = FakeConnection()
+            app.react(conn, HTTPRequest(
+                url='/', method='GET', version='HTTP/1.1',
+                headers=HTTPRequestHeader({'If-None-Match': etag})))
+            return conn.stream.written[0]
+
+        first = serve()
+        assert first.endswith(b'user-0;same')
+        etag = first.split(b'Etag: ', 1)[1].split(b'\r\n', 1)[0]
+
+        # Body written in `initialize` has changed, so it's not 304.
+        second = serve(etag.decode())
+        assert second.startswith(b'HTTP/1.1 200 OK\r\n')
+        assert second.endswith(b'user-1;same')
+
+    def test_access_log(self):
+        class WindResource(Resource):
+            def handle_get(self):
+                self.write('wind')
+                self.finish()
+
+        class FakeReactor(object):
+            def __init__(self):
+                self.callbacks = []
+
+            def attach_callback(self, callback):
+                self.callbacks.append(callback)
+
+        app = WindApp([path(WindResource, route='/', methods=['get'])])
+
+        def serve():
+            app.react(FakeConnection(), HTTPRequest(
+                url='/', method='GET', version='HTTP/1.1',
+                headers=HTTPRequestHeader()))
+
+        # Without reactor, log is written immediately and reactor
+        # is not created.
+        with mock.patch.object(wind_app.wind_logger, 'log') as log:
+            serve()
+        assert log.call_count == 1
+        assert not PollReactor.exist()
+        assert not wind_app._access_log_queue
+
+        reactor = FakeReactor()
+        PollReactor._instance = reactor
+        try:
+            # Entries are queued and flushed by single callback.
+            serve()
+            serve()
+            assert len(wind_app._access_log_queue) == 2
+            assert reactor.callbacks == [wind_app._flush_access_log]
+
+            # Failed flush should not strand remaining entries.
+            with mock.patch.object(
+                    wind_app.wind_logger, 'log',
+                    side_effect=[IOError, None]) as log:
+                self.assertRaises(IOError, reactor.callbacks.pop())
+                assert len(wind_app._access_log_queue) == 1
+                assert reactor.callbacks == [wind_app._flush_access_log]
+
+                reactor.callbacks.pop()()
+            assert log.call_count == 2
+            assert not wind_app._access_log_queue
+            assert not reactor.callbacks
+
+            # Next entry schedules flush again.
+            serve()
+            assert reactor.callbacks == [wind_app._flush_access_log]
+            with mock.patch.object(wind_app.wind_logger, 'log'):
+                reactor.callbacks.pop()()
+        finally:
+            del PollReactor._instance
+
+    def test_access_log_flushed_on_reactor_stop(self):
+        class WindResource(Resource):
+            def handle_get(self):
+                self.write('wind')
+                self.finish()
+
+        app = WindApp([path(WindResource, route='/', methods=['get'])])
+        reactor = PollReactor()
+        reader, writer = socket.socketpair()
+
+        def serve_and_stop(fd, event_mask):
+            reader.recv(1)
+            # Entry is queued after which reactor is stopped.
+            app.react(FakeConnection(), HTTPRequest(
+                url='/', method='GET', version='HTTP/1.1',
+                headers=HTTPRequestHeader()))
+            reactor.stop()
+
+        PollReactor._instance = reactor
+        try:
+            reactor.attach_handler(
+                reader.fileno(), PollEvents.READ, serve_and_stop)
+            writer.send(b'w')
+            with mock.patch.object(wind_app.wind_logger, 'log') as log:
+                reactor.run()
+            assert log.call_count == 1
+            assert not wind_app._access_log_queue
+        finally:
+            del PollReactor._instance
+            reactor.remove_handler(reader.fileno())
+            reactor._heartbeat.die()
+            reader.close()
+            writer.close()
+
+    def test_path_allowed(self):
+        def handler(request):
+            return 'wind'
+
+        path_ = path(handler, route='/', methods=['GET', 'post'])
+        assert path_.allowed(HTTPMethodId.GET)
+        assert path_.allowed(HTTPMethodId.POST)
+        assert not path_.allowed(HTTPMethodId.DELETE)
+        assert not path_.allowed(None)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -8,6 +8,7 @@
 """
 
 import collections
+import collections.abc
 
 
 class FlexibleDeque(collections.deque):
@@ -77,7 +78,7 @@ class FlexibleDeque(collections.deque):
         return '%s(%s)' % (name, str(list(self)))
 
 
-class FlexibleDict(collections.MutableMapping):
+class FlexibleDict(collections.abc.MutableMapping):
     """Provides flexible transformations to dict `key`"""
     def __init__(self, dict_=None):
         # `_store` stores (key, value) tuple on each key.
@@ -8,7 +8,6 @@
 """
 
 import logging
-from wind.compat import basestring
 from wind.exceptions import LoggerError
 
 
@@ -88,7 +87,7 @@ class BaseLogger(object):
         ex) '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
         """
-        if not isinstance(format_, basestring):
+        if not isinstance(format_, (str, bytes)):
             raise LoggerError('Invalid log formatter')
         self._format = format_
         self._logger(log_type).setFormatter(self.formatter)
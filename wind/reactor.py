@@ -163,7 +163,15 @@ class PollReactor(object):
                     # XXX: should be handled properly
                     raise
 
+        # Callbacks attached before `stop` are run once before returning,
+        # so that they are not silently dropped.
+        self._run_callback()
+
     def stop(self):
+        """Stop reactor at the next loop.
+        Callbacks already attached are still run before `run` returns.
+
+        """
         self._running = False
 
 Reactor = PollReactor
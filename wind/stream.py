@@ -10,7 +10,6 @@
 import socket
 from wind.reactor import Reactor
 from wind.driver import PollEvents
-from wind.compat import basestring
 from wind.datastructures import FlexibleDeque
 from wind.exceptions import StreamError, EWOULDBLOCK, ECONNRESET
 
@@ -141,7 +140,7 @@ class BaseStream(object):
         @param include(optional): if True, include `delimiter` in chunk.
 
         """
-        if not isinstance(delimiter, basestring):
+        if not isinstance(delimiter, (str, bytes)):
             raise StreamError('`read_until` can only accept `str` param')
         self._delimiter = delimiter
         self._include_delimiter = include
@@ -243,7 +242,7 @@ class BaseStream(object):
         self._attach_stream_handler(PollEvents.READ)
 
     def write(self, chunk, callback):
-        if not isinstance(chunk, basestring):
+        if not isinstance(chunk, (str, bytes)):
             raise StreamError('Can write only chunk of `bytes`')
 
         self._add_callback(callback, read=False)
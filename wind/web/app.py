@@ -7,16 +7,19 @@
 
 """
 
+import re
 import json
 import types
 import hashlib
+import atexit
 import traceback
+import collections
+from wind.reactor import Reactor
 from wind.web.codec import encode, to_str
 from wind.log import wind_logger, LogType
 from wind.web.httpmodels import (
-    HTTPRequest, HTTPResponse, HTTPMethod,
+    HTTPRequest, HTTPResponse, HTTPMethod, HTTPMethodId,
     HTTPStatusCode, HTTPResponseHeader)
-from wind.datastructures import FlexibleDeque
 from wind.exceptions import ApplicationError, HTTPError
 
 
@@ -56,6 +59,7 @@ class WindApp(object):
 
     def __init__(self, urls):
         self._dispatcher = PathDispatcher(urls)
+        self._error_path = Path(self._error_handler)
 
     def react(self, conn, request):
         if not isinstance(request, HTTPRequest):
@@ -67,8 +71,8 @@ class WindApp(object):
             # XXX: Should expose various error states in `react`.
             # (Not only returning False stupidly)
 
-            # Let's make a path to error.
-            path = Path(self._error_handler)
+            # Let's follow the path to error.
+            path = self._error_path
 
         # Synchronously run handling method. (Temporarily)
         path.follow(conn, request)
@@ -77,18 +81,55 @@ class WindApp(object):
         raise HTTPError(HTTPStatusCode.NOT_FOUND)
 
 
+# Number of dynamic routes compiled into one regex.
+_ROUTE_CHUNK_SIZE = 25
+
+
+def _is_static(route):
+    """Returns True if `route` has no `:param` or `*glob` segment."""
+    return ':' not in route and '*' not in route
+
+
 class PathDispatcher(object):
+    """Dispatches url to registered `Path`.
+    Static routes are indexed by dict, so that dispatching them costs
+    only one dict lookup. Patterns of routes containing `:param` or `*glob`
+    segments are joined into alternation regexes by chunk of routes, so that
+    single `re` match call dispatches among many dynamic routes.
+
+    """
     def __init__(self, urls):
-        try:
-            self._paths = []
-            self._paths.extend(urls)
-        except TypeError:
+        if isinstance(urls, (str, bytes)) or not hasattr(urls, '__iter__'):
             raise ApplicationError('PathDispatcher wants `list` of `Path`')
+        self._paths = tuple(urls)
 
-    def lookup(self, url):
+        self._static = {}
+        dynamic = []
         for path in self._paths:
-            if url == path.route:
-                return path
+            if _is_static(path.route):
+                # Former path has priority like linear scanning did.
+                self._static.setdefault(path.route, path)
+            else:
+                dynamic.append(path)
+
+        # Each pattern is wrapped with exactly one capturing group,
+        # so `lastindex` of match indicates matched path in chunk.
+        self._dynamic = []
+        for i in range(0, len(dynamic), _ROUTE_CHUNK_SIZE):
+            chunk = tuple(dynamic[i:i + _ROUTE_CHUNK_SIZE])
+            regex = re.compile(
+                '|'.join('(%s)' % path.pattern for path in chunk))
+            self._dynamic.append((regex, chunk))
+
+    def lookup(self, url):
+        path = self._static.get(url)
+        if path is not None:
+            return path
+
+        for regex, chunk in self._dynamic:
+            match = regex.fullmatch(url)
+            if match is not None:
+                return chunk[match.lastindex - 1]
 
 
 class Path(object):
@@ -106,21 +147,30 @@ class Path(object):
             Allowed HTTP methods. `List` of string indicating method.
 
         """
-        # if handler is not method binding, delay handler creation time
-        # to time when actually serving request.
-        if isinstance(handler, (types.FunctionType, types.MethodType)):
-            handler = self._wrap_handler(handler)
+        # `Resource` holds state of request, so that handler creation is
+        # delayed to time when actually serving request.
         self._handler = handler
+        self._class_handler = isinstance(handler, type)
+        self._function_handler = \
+            isinstance(handler, (types.FunctionType, types.MethodType))
         self._error_path = route is None
+        self._methods = frozenset()
+        self._method_mask = 0
         if not self._error_path:
             self._route = self._process_route(route)
-            self._methods = \
-                [self._validate_method(method.lower()) for method in methods]
+            self._methods = frozenset(
+                self._validate_method(method.lower()) for method in methods)
+            for method in self._methods:
+                self._method_mask |= 1 << HTTPMethodId[method.upper()]
 
     @property
     def route(self):
         return self._route
 
+    @property
+    def pattern(self):
+        return self._pattern
+
     @property
     def methods(self):
         return self._methods
@@ -129,10 +179,10 @@ class Path(object):
     def error_path(self):
         return self._error_path
 
-    def allowed(self, method):
-        """Assume param `method` has already converted to lowercase"""
-        if hasattr(self, '_methods'):
-            return method in self._methods
+    def allowed(self, method_id):
+        """Check allowed methods with `HTTPMethodId` of request"""
+        return method_id is not None and \
+            bool(self._method_mask & (1 << method_id))
 
     def follow(self, conn, request):
         """Go after the path!
@@ -140,9 +190,11 @@ class Path(object):
         react to HTTP request.
 
         """
-        if isinstance(self._handler, type):
+        if self._class_handler:
             # Actual handler creation for user-defined `Resource`.
             self._handler(path=self).react(conn, request)
+        elif self._function_handler:
+            self._wrap_handler(self._handler).react(conn, request)
         else:
             self._handler.react(conn, request)
 
@@ -156,20 +208,80 @@ class Path(object):
         this path. Return newly created `Resource` object.
 
         """
-        if not hasattr(handler, '__call__'):
-            raise ApplicationError(
-                'Request handler registered to app should be callable')
-
         resource = Resource(path=self)
         resource.inject(method=handler)
         return resource
 
     def _process_route(self, route):
-        """Process with regex in route"""
-        # XXX: Not implemented yet
+        """Process with regex in route.
+        Builds regex pattern of route into `self._pattern`.
+        `:param` segment matches any single segment, and `*glob` segment
+        matches rest of url. Parameters are not captured yet.
+
+        """
+        segments = []
+        for segment in route.split('/'):
+            if segment.startswith('*'):
+                segments.append('.*')
+                break
+            elif segment.startswith(':'):
+                segments.append('[^/]+')
+            else:
+                segments.append(re.escape(segment))
+        self._pattern = '/'.join(segments)
         return route
 
 
+# Access log entries of (method, url, status_code) waiting to be written.
+_access_log_queue = collections.deque()
+# Whether `_flush_access_log` is attached to `Reactor` and not run yet.
+_access_log_flush_scheduled = False
+
+
+def _write_access_log(method, url, status_code):
+    wind_logger.log(
+        '%s %s %s' % (method.upper(), url, status_code), LogType.ACCESS)
+
+
+def _schedule_access_log_flush():
+    global _access_log_flush_scheduled
+    _access_log_flush_scheduled = True
+    Reactor.instance().attach_callback(_flush_access_log)
+
+
+def _flush_access_log():
+    """Format and write queued access log entries.
+    This runs as callback of `Reactor`, out of response completion path.
+    If writing an entry fails, the entry is dropped and flush of remaining
+    entries is scheduled again, so that they are not stranded in queue.
+    NOTE that timestamp of log is time of flush, not time when response
+    has completed.
+    This also runs at interpreter exit, in case reactor has not run it
+    (e.g. server is interrupted by `KeyboardInterrupt`).
+
+    """
+    global _access_log_flush_scheduled
+    _access_log_flush_scheduled = False
+    try:
+        while _access_log_queue:
+            _write_access_log(*_access_log_queue.popleft())
+    finally:
+        if _access_log_queue and not _access_log_flush_scheduled \
+                and Reactor.exist():
+            _schedule_access_log_flush()
+
+
+atexit.register(_flush_access_log)
+
+
+# HTTP errors which `Resource` responds with its status code.
+_HANDLED_HTTP_ERRORS = frozenset([
+    HTTPStatusCode.NOT_FOUND,
+    HTTPStatusCode.METHOD_NOT_ALLOWED,
+    HTTPStatusCode.NOT_MODIFIED
+    ])
+
+
 class Resource(object):
     """Class for HTTP web resource.
     May inherit this class to implement `comet` or asynchronously
@@ -184,6 +296,7 @@ class Resource(object):
     - remove_response_header(key)
     - send_response(status_code=HTTPStatusCode.OK)
     - write(chunk, left=False)
+    - write_json(obj)
     - finish()
 
     Methods may be overrided:
@@ -196,23 +309,46 @@ class Resource(object):
     - handle_head(request)
     - _error_message()
 
+    NOTE that `handle_*` methods are collected once when class is created.
+    `handle_*` assigned to class or instance afterwards (e.g. in
+    `initialize`) is ignored. Define them in class body.
+
     """
+    # `handle_*` functions indexed by `HTTPMethodId`.
+    # Built once per class by `_build_dispatch_table`.
+    _dispatch_table = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super(Resource, cls).__init_subclass__(**kwargs)
+        cls._build_dispatch_table()
+
+    @classmethod
+    def _build_dispatch_table(cls):
+        cls._dispatch_table = tuple(
+            getattr(cls, 'handle_' + method_id.name.lower())
+            for method_id in HTTPMethodId)
+
     def __init__(self, path=None):
         self._path = path
         self._synchronous_handler = None
         self._conn = None
+        self._stream_write = None
         self._request = None
         self._response = None
         self._status_code = None
         self._processing = False
-        self._write_buffer = FlexibleDeque()
-        self._write_buffer_bytes = 0
+        self._header_bytes = b''
+        self._body = bytearray()
         self._response_header = HTTPResponseHeader()
+        # Created in `react` only if `Etag` is available for the request.
+        self._etag_hasher = None
         self._asynchronous = True
-        self.initialize()
 
     def initialize(self):
-        """Constructor hook"""
+        """Initialize hook.
+        Called in `react` when request method is allowed.
+
+        """
         pass
 
     def handle_get(self):
@@ -240,13 +376,20 @@ class Resource(object):
     def react(self, conn, request):
         self._processing = True
         self._conn = conn
+        self._stream_write = conn.stream.write
         self._request = request
 
         try:
-            if not self._path.allowed(request.method) \
+            if not self._path.allowed(request.method_id) \
                     and not self._path.error_path:
                 self._raise_not_allowed()
 
+            # Hasher should exist before `initialize`, so that chunk
+            # written in `initialize` is also hashed.
+            # Error path always ends with error response, which has no etag.
+            if not self._path.error_path and self._etag_available():
+                self._etag_hasher = hashlib.blake2b(digest_size=16)
+            self.initialize()
             if self._synchronous_handler is not None:
                 # Simply run synchronous handler for test!
                 # NOTE that there's no etag support to this kind of handler.
@@ -255,17 +398,11 @@ class Resource(object):
                 self.finish()
             else:
                 # Execute request handler
-                getattr(self, 'handle_' + request.method)()
+                self._dispatch_table[request.method_id](self)
                 if not self._asynchronous:
                     self.finish()
         except HTTPError as e:
-            http_errors = \
-                [
-                    HTTPStatusCode.NOT_FOUND,
-                    HTTPStatusCode.METHOD_NOT_ALLOWED,
-                    HTTPStatusCode.NOT_MODIFIED
-                ]
-            if e.args[0] in http_errors:
+            if e.args[0] in _HANDLED_HTTP_ERRORS:
                 self.send_response(status_code=e.args[0])
             else:
                 # XXX: Grab this.
@@ -275,18 +412,36 @@ class Resource(object):
             self.send_response(
                 status_code=HTTPStatusCode.INTERNAL_SERVER_ERROR)
 
-    def write(self, chunk, left=False):
-        if isinstance(chunk, dict):
-            chunk = json.dumps(chunk)
-            self._response_header.to_json_content()
+    def write(self, chunk, left=False, _encode=encode):
+        """Write `bytes` or `str` chunk to buffer.
+        `dict` chunk is passed to `write_json`, but prefer calling
+        `write_json` directly for json response.
+        NOTE that underscored params are bound as default arguments to make
+        them local lookups. Do not pass them.
 
+        """
         if chunk:
-            chunk = encode(chunk)
+            encoded = _encode(chunk)
+            if encoded is None:
+                # Cold path for chunk that `encode` can't handle.
+                if isinstance(chunk, dict):
+                    self.write_json(chunk)
+                    return
+                raise ApplicationError(
+                    'Can write only `bytes`, `str` or `dict` chunk')
+            chunk = encoded
             if left:
-                self._write_buffer.appendleft(chunk)
+                self._header_bytes = chunk + self._header_bytes
             else:
-                self._write_buffer.append(chunk)
-            self._write_buffer_bytes += len(chunk)
+                self._body.extend(chunk)
+                hasher = self._etag_hasher
+                if hasher is not None:
+                    hasher.update(chunk)
+
+    def write_json(self, obj, _dumps=json.dumps):
+        """Serialize `obj` to compact json and write it to buffer."""
+        self._response_header.to_json_content()
+        self.write(_dumps(obj, separators=(',', ':')))
 
     def add_response_header(self, key, value):
         self._response_header.add(key, value)
@@ -301,12 +456,12 @@ class Resource(object):
         """
         self._status_code = status_code
 
-    def finish(self):
+    def finish(self, _ok=HTTPStatusCode.OK):
         """This method finishes current connection by sending response
-        with written chunk in self._write_buffer.
+        with written chunk in self._body.
 
         """
-        if self._etag_available():
+        if self._etag_hasher is not None:
             etag = self._generate_etag()
             request_etag = self._get_etag()
             if request_etag == etag:
@@ -314,21 +469,21 @@ class Resource(object):
             else:
                 self._set_etag(etag)
 
-        if self._write_buffer:
-            self._response_header. \
-                add_content_length(self._write_buffer_bytes)
+        if self._body:
+            self._response_header.add_content_length(len(self._body))
 
-        self.set_status_code(HTTPStatusCode.OK)
+        self.set_status_code(_ok)
         self._generate_response()
         self.write(self._response.raw(), left=True)
-        self._write_buffer.gather(self._write_buffer_bytes)
-        self._conn.stream.write(self._write_buffer.popleft(), self._clear)
+        payload = self._header_bytes + self._body
+        self._flush_buffer()
+        self._stream_write(payload, self._clear)
 
     def send_response(self, status_code=HTTPStatusCode.OK):
         """This method finishes current connection by sending response which
         is typically error.
         NOTE that it will write only response headers regardless of chunks
-        in self._write_buffer.
+        in self._body.
 
         """
         self._flush_buffer()
@@ -336,8 +491,9 @@ class Resource(object):
         self.write(self._error_message())
         self._generate_response()
         self.write(self._response.raw(), left=True)
-        self._write_buffer.gather(self._write_buffer_bytes)
-        self._conn.stream.write(self._write_buffer.popleft(), self._clear)
+        payload = self._header_bytes + self._body
+        self._flush_buffer()
+        self._stream_write(payload, self._clear)
 
     def _error_message(self):
         """This method can be overrided to make custom error message
@@ -351,30 +507,43 @@ class Resource(object):
         Calling this method publically is not recommended.
         NOTE that if response_header has changed after this method is called,
         you should call this method again to generate response.
+        NOTE that generated response shares `self._response_header`, which
+        is cleared in `_clear` after response is sent.
 
         """
         self._response = HTTPResponse(
-            request=self._request, headers=self._response_header.to_dict(),
+            request=self._request, headers=self._response_header,
             status_code=self._status_code)
 
     def _clear(self):
         self._conn.close()
         self._log_access()
         self._processing = False
-        self._conn = self._request = None
+        self._conn = self._request = self._stream_write = None
         self._flush_buffer()
         self._response_header.clear()
 
     def _flush_buffer(self):
-        self._write_buffer = FlexibleDeque()
-        self._write_buffer_bytes = 0
+        self._header_bytes = b''
+        self._body.clear()
+        self._etag_hasher = None
 
     def _log_access(self):
+        """Queue access log entry. Entries are written in batch
+        by `_flush_access_log` on the next loop of `Reactor`.
+        If there's no `Reactor` (e.g. app is not served by server), entry is
+        written immediately, not to create `Reactor` as a side effect.
+
+        """
         if self._request is not None and self._response is not None:
-            msg = '%s %s %s' % \
-                (self._request.method.upper(), self._request.url,
-                    self._response.status_code)
-            wind_logger.log(msg, LogType.ACCESS)
+            entry = (self._request.method, self._request.url,
+                     self._response.status_code)
+            if not Reactor.exist():
+                _write_access_log(*entry)
+                return
+            _access_log_queue.append(entry)
+            if not _access_log_flush_scheduled:
+                _schedule_access_log_flush()
 
     def _get_etag(self):
         """Get `Etag` from `If-None-Match` in HTTP request headers"""
@@ -384,24 +553,29 @@ class Resource(object):
         """Add `Etag` header to response header"""
         self._response_header.add_etag(etag)
 
-    def _generate_etag(self):
-        """Generate etag value for chunk in self._write_buffer.
-        This method use md5 hashing to generate etag.
-        The MD5 hash assures that the actual etag is only 32 characters long,
+    def _generate_etag(self, _to_str=to_str):
+        """Generate etag value for chunk in self._body.
+        This method use 128-bit blake2b hashing to generate etag.
+        The hash assures that the actual etag is only 32 characters long,
         while assuring that they are highly unlikely to collide.
+        blake2b is faster than MD5 on large response body.
+        Body is hashed incrementally in `write`, so this method only
+        finalizes the hash.
 
         """
-        md5 = hashlib.md5()
-        for chunk in self._write_buffer:
-            md5.update(chunk)
-        return to_str(md5.hexdigest())
+        return _to_str(self._etag_hasher.hexdigest())
 
     def _etag_available(self):
         """Checks if `Etag` can be used. This method is needed because
         there is no `Etag` in HTTP 1.0 (RFC 1945).
         This method can be overrided to disable `Etag` cache validation.
+        It is checked once per request in `react`, before `initialize`.
         If this method always returns `False`, this handler don't use
         `Etag` any more.
 
         """
-        return float(self._request.version[-3:]) > 1.0
+        version_info = self._request.version_info
+        return version_info is not None and version_info > (1, 0)
+
+
+Resource._build_dispatch_table()
@@ -8,15 +8,12 @@
 """
 
 from wind.exceptions import CodecError
-from wind.compat import unicode, is_py3
 
 _DEFAULT_ENCODING = 'utf8'
 
 
 def encode(chunk, encoding=_DEFAULT_ENCODING):
-    """if chunk is unicode, encode chunk to specified encoding `utf8`.
-    Should take `unicode` from compat because string is `unicode` by default
-    in python 3.x
+    """if chunk is `str`, encode chunk to specified encoding `utf8`.
     NOTE that if chunk is `int`, it will be converted to str and encoded.
 
     """
@@ -26,7 +23,7 @@ def encode(chunk, encoding=_DEFAULT_ENCODING):
 
         if isinstance(chunk, bytes):
             return chunk
-        if isinstance(chunk, unicode):
+        if isinstance(chunk, str):
             return chunk.encode(encoding)
 
 
@@ -36,7 +33,7 @@ def to_str(bytes_):
     and returns bytes decoded object.
 
     """
-    if not is_py3 or isinstance(bytes_, str):
+    if isinstance(bytes_, str):
         return bytes_
 
     if isinstance(bytes_, (tuple, list)):
@@ -49,8 +46,6 @@ def to_str(bytes_):
 def decode_dict(dict_):
     """Let k, v pairs of `dict` to be decoded by `to_str` method.
     This method returnes newly created `dict` with k, v decoded."""
-    if not is_py3:
-        return dict_
     if not isinstance(dict_, dict):
         raise CodecError('`encode_dict` only accepts `dict`')
 
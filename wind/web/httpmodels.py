@@ -7,12 +7,13 @@
 
 """
 
+from enum import IntEnum
+from urllib.parse import urlparse, parse_qsl
 from wind import __version__
 from wind.stream import SocketStream
 from wind.exceptions import WindException
 from wind.datastructures import CaseInsensitiveDict
 from wind.web.codec import encode, to_str, decode_dict
-from wind.compat import urlparse, parse_qsl, basestring
 
 
 class HTTPStatusCode():
@@ -44,6 +45,21 @@ class HTTPMethod():
             ]
 
 
+class HTTPMethodId(IntEnum):
+    """Integer id of HTTP methods, used for internal dispatching.
+    Ids are in the same order as `HTTPMethod.all()`.
+
+    """
+    GET = 0
+    POST = 1
+    PUT = 2
+    HEAD = 3
+    DELETE = 4
+
+
+_METHOD_IDS = dict((id_.name.lower(), id_) for id_ in HTTPMethodId)
+
+
 class HTTPRequestContentType():
     """Only supports form content types"""
     DEFAULT = 'application/x-www-form-urlencoded'
@@ -99,9 +115,29 @@ class HTTPRequestHeader(HTTPHeader):
 
 
 class HTTPResponseHeader(HTTPHeader):
+    """Response header which keeps each header line already encoded.
+    Lines are encoded when header is added, so that `serialize` only
+    joins them instead of encoding whole headers on every response.
+
+    """
     def __init__(self, dict_=None):
-        self._headers = self.default()
-        self._headers.update(dict_ or {})
+        self._headers = CaseInsensitiveDict()
+        self._lines = {}
+        self.update(self.default())
+        self.update(dict_ or {})
+
+    def add(self, key, value):
+        self._headers[key] = value
+        self._lines[key.lower()] = \
+            encode(key) + b': ' + encode(value) + b'\r\n'
+
+    def remove(self, key):
+        self._headers.pop(key, None)
+        self._lines.pop(key.lower(), None)
+
+    def update(self, headers):
+        for key, value in headers.items():
+            self.add(key, value)
 
     def add_etag(self, etag):
         self.add('Etag', etag)
@@ -112,8 +148,25 @@ class HTTPResponseHeader(HTTPHeader):
             'Server': 'wind ' + __version__
             })
 
+    def clear(self):
+        self._headers = CaseInsensitiveDict()
+        self._lines = {}
+        self.update(self.default())
+
+    def to_dict(self):
+        """Returns copy of headers as `CaseInsensitiveDict`.
+        Mutating returned dict doesn't change this header. Use `add` or
+        `remove` instead, so that encoded lines are kept in sync.
+
+        """
+        return CaseInsensitiveDict(self._headers)
+
+    def serialize(self):
+        """Returns `bytes` of encoded header lines"""
+        return b''.join(self._lines.values())
+
     def to_json_content(self):
-        self._headers['Content-Type'] = 'application/json; charset=UTF-8'
+        self.add('Content-Type', 'application/json; charset=UTF-8')
 
 
 class HTTPRequest(object):
@@ -123,33 +176,54 @@ class HTTPRequest(object):
             params=None, body=None, auth=None, cookies=None, version=None):
 
         self.url = url
-        if isinstance(method, basestring):
+        self.method_id = None
+        if isinstance(method, (str, bytes)):
             self.method = method.lower()
+            self.method_id = _METHOD_IDS.get(self.method)
         self.headers = headers or {}
         self.params = params or {}
         self.body = body
         self.auth = auth
         self.cookies = cookies
         self.version = version
+        self.version_info = self._parse_version(version)
 
     @property
     def path(self):
         return urlparse(self.url).path
 
+    def _parse_version(self, version):
+        """Parse `HTTP/1.1` to `(1, 1)` tuple.
+        Returns None if `version` is not valid HTTP version.
+
+        """
+        try:
+            major, _, minor = version[5:].partition('.')
+            return (int(major), int(minor or 0))
+        except (TypeError, ValueError):
+            return None
+
     def __repr__(self):
         return '<HTTPRequest [%s]>' % (self.method)
 
 
 class HTTPResponse(object):
-    """HTTP Response object"""
+    """HTTP Response object
+    NOTE that if `headers` is `HTTPResponseHeader`, it is used as is without
+    copying. Changes to that header object (including `clear`) are reflected
+    to this response.
+
+    """
     def __init__(
             self, request=None, reply=None, headers=None,
             cookies=None, status_code=None):
 
         self.request = request
         self.reply = reply
-        self.headers = HTTPResponseHeader()
-        self.headers.update(headers or {})
+        if isinstance(headers, HTTPResponseHeader):
+            self.headers = headers
+        else:
+            self.headers = HTTPResponseHeader(headers)
         self.cookies = cookies
         self.status_code = status_code
         if self.status_code is not None:
@@ -158,11 +232,8 @@ class HTTPResponse(object):
     def raw(self):
         if self.reply is not None:
             separator = b'\r\n'
-            raw = encode(self.reply) + separator
-            for k, v in self.headers.to_dict().items():
-                raw += encode(k) + b': ' + encode(v) + separator
-            raw += separator
-            return raw
+            return encode(self.reply) + separator + \
+                self.headers.serialize() + separator
 
     def _generate_reply(self, status_code):
         version = self.request.version